@@ -0,0 +1,176 @@
+import ipaddress
+import json
+import os
+import socket
+import socketserver
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+
+# Commands the daemon forwards to MonitorService. Each maps to a method of the
+# same name and is called with the request's keyword arguments.
+COMMANDS = (
+    "get_config",
+    "status_snapshot",
+    "save_config",
+    "connect_obs",
+    "start_stream",
+    "stop_stream",
+    "clear_logs",
+    "get_replays",
+    "set_replay_keep",
+)
+
+
+def parse_address(address):
+    """Split "host:port", refusing anything but a loopback host.
+
+    The daemon has no authentication and get_config returns the OBS password,
+    so it must never listen on a network interface.
+    """
+    host, _, port = (address or DEFAULT_ADDRESS).rpartition(":")
+    host = host.strip("[]") or "127.0.0.1"
+    if host != "localhost":
+        try:
+            loopback = ipaddress.ip_address(host).is_loopback
+        except ValueError:
+            loopback = False
+        if not loopback:
+            raise ValueError(f"Monitor daemon address must be a loopback host, got {host!r}")
+    return host, int(port)
+
+
+class DaemonError(Exception):
+    pass
+
+
+def _decode_bytes(obj):
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """One JSON request line in, one JSON response line out."""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            cmd = request.get("cmd")
+            if cmd not in COMMANDS:
+                raise ValueError(f"Unknown command: {cmd}")
+            result = getattr(self.server.service, cmd)(**request.get("args", {}))
+            response = {"ok": True, "result": result}
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+        # Serialized status bodies are UTF-8 JSON bytes; ship them as text
+        self.wfile.write(json.dumps(response, default=_decode_bytes).encode("utf-8") + b"\n")
+
+
+class MonitorDaemon(socketserver.ThreadingTCPServer):
+    """Owns the single MonitorService and serves it over a local socket.
+
+    Started by ``manage.py runmonitor`` so the TikTok clients and OBS
+    connections live in one process, no matter how many web workers run.
+    """
+
+    daemon_threads = True
+    # On Windows SO_REUSEADDR lets a second daemon bind the same port silently
+    allow_reuse_address = os.name != "nt"
+
+    def __init__(self, address=None):
+        from .service import MonitorService
+
+        server_address = parse_address(address)
+        if ":" in server_address[0]:
+            self.address_family = socket.AF_INET6
+        self.service = MonitorService.get_instance()
+        super().__init__(server_address, _RequestHandler)
+        # Only once the port is ours: a second runmonitor must fail before it
+        # starts deleting replays alongside the first
+        self.service.retention.start()
+
+
+class MonitorClient:
+    """Drop-in stand-in for MonitorService that proxies calls to the daemon."""
+
+    def __init__(self, address=None, timeout=5):
+        self.address = parse_address(address)
+        self.timeout = timeout
+
+    def _call(self, cmd, **args):
+        try:
+            with socket.create_connection(self.address, timeout=self.timeout) as sock:
+                sock.sendall(json.dumps({"cmd": cmd, "args": args}).encode("utf-8") + b"\n")
+                with sock.makefile("rb") as f:
+                    line = f.readline()
+        except OSError as e:
+            raise DaemonError(f"Monitor daemon unreachable at {self.address[0]}:{self.address[1]}: {e}")
+        if not line:
+            raise DaemonError("Monitor daemon closed the connection")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "Unknown daemon error"))
+        return response.get("result")
+
+    def get_config(self):
+        return self._call("get_config")
+
+    def status_snapshot(self, stream_filter=None, since=None, known_versions=None):
+        # One round trip per poll, including the not-modified case
+        version, body = self._call(
+            "status_snapshot", stream_filter=stream_filter, since=since, known_versions=known_versions
+        )
+        return version, body.encode("utf-8") if body is not None else None
+
+    def save_config(self, usernames, obs_password, source_name, keywords, notifications_enabled=True, notification_duration=5):
+        return self._call(
+            "save_config",
+            usernames=usernames,
+            obs_password=obs_password,
+            source_name=source_name,
+            keywords=keywords,
+            notifications_enabled=notifications_enabled,
+            notification_duration=notification_duration,
+        )
+
+    def connect_obs(self):
+        return tuple(self._call("connect_obs"))
+
+    def start_stream(self, username):
+        return self._call("start_stream", username=username)
+
+    def stop_stream(self, username):
+        return self._call("stop_stream", username=username)
+
+    def clear_logs(self):
+        return self._call("clear_logs")
+
+    def get_replays(self):
+        return self._call("get_replays")
+
+    def set_replay_keep(self, path, keep):
+        return self._call("set_replay_keep", path=path, keep=keep)
+
+
+def get_service():
+    """Return the monitor the views should talk to.
+
+    With ``MONITOR_DAEMON_ADDRESS`` set, every web worker shares the daemon
+    started by ``manage.py runmonitor``. Otherwise the service runs embedded in
+    the web process, which is fine for a single ``runserver``. Only that
+    embedded monitor runs replay retention, unless ``MONITOR_RETENTION`` is off.
+    """
+    from django.conf import settings
+
+    address = getattr(settings, "MONITOR_DAEMON_ADDRESS", None)
+    if address:
+        return MonitorClient(address)
+
+    from .service import MonitorService
+    service = MonitorService.get_instance()
+    if getattr(settings, "MONITOR_RETENTION", True):
+        service.retention.start()
+    return service
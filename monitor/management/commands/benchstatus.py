@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from monitor.daemon import get_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test /api/status through the full middleware stack on a single thread. "
+        "Without MONITOR_DAEMON_ADDRESS this builds the live MonitorService (retention disabled)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario (default: 2000)")
+        parser.add_argument("--logs", type=int, default=100, help="Log lines to seed the status with (default: 100)")
+        parser.add_argument("--min-rps", type=float, default=200, help="Fail if any scenario is slower (default: 200)")
+
+    # In embedded mode this builds the real MonitorService (config file and
+    # all), so keep its retention thread from deleting replays
+    @override_settings(MONITOR_RETENTION=False)
+    def handle(self, *args, **options):
+        service = get_service()
+        if hasattr(service, "log"):
+            # Embedded service: seed a realistic log buffer
+            for i in range(options["logs"]):
+                service.log(f"Benchmark log line {i} with some trigger-sized text in it", "info")
+
+        client = Client(HTTP_HOST="localhost")
+        first = client.get("/api/status")
+        etag = first["ETag"]
+        version = first.json()["version"]
+
+        scenarios = [
+            ("full snapshot", {}, {}),
+            ("full snapshot, gzip", {}, {"HTTP_ACCEPT_ENCODING": "gzip"}),
+            ("delta since current", {"since": version}, {}),
+            ("If-None-Match -> 304", {"since": version}, {"HTTP_IF_NONE_MATCH": etag}),
+        ]
+        n = options["requests"]
+        self.stdout.write(f"{'scenario':<24} {'req/s':>9} {'ms/req':>8} {'bytes':>7}  status")
+        too_slow = []
+        for name, params, headers in scenarios:
+            start = time.perf_counter()
+            for _ in range(n):
+                response = client.get("/api/status", params, **headers)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{name:<24} {n / elapsed:9.0f} {elapsed / n * 1000:8.3f} {len(response.content):7}  {response.status_code}"
+            )
+            if n / elapsed < options["min_rps"]:
+                too_slow.append(name)
+
+        if too_slow:
+            raise CommandError(f"Below {options['min_rps']:.0f} req/s: {', '.join(too_slow)}")
@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a web worker imports before it can answer its first request.
+BOOT_SNIPPET = """
+import django
+django.setup()
+import {root_urlconf}
+"""
+
+
+def parse_importtime(stderr):
+    """Parse `-X importtime` output into (module, self_us, cumulative_us) rows."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            # Header line
+            continue
+        rows.append((fields[2].strip(), self_us, cumulative_us))
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Measure how long a fresh process takes to boot Django and import the URLconf (-X importtime report)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list (default: 15)")
+        parser.add_argument("--module", action="append", default=[], help="Extra module to import after boot (repeatable)")
+
+    def handle(self, *args, **options):
+        code = BOOT_SNIPPET.format(root_urlconf=settings.ROOT_URLCONF)
+        for module in options["module"]:
+            code += f"import {module}\n"
+
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "tiktok_obs.settings"))
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True, text=True, env=env, cwd=settings.BASE_DIR,
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        if proc.returncode != 0:
+            errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+            raise CommandError("Boot failed:\n" + "\n".join(errors))
+
+        rows = parse_importtime(proc.stderr)
+
+        total_ms = sum(r[1] for r in rows) / 1000
+        self.stdout.write(f"Boot wall time:   {wall_ms:8.1f} ms")
+        self.stdout.write(f"Import time:      {total_ms:8.1f} ms across {len(rows)} modules")
+        self.stdout.write("")
+        self.stdout.write(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[:options["top"]]:
+            self.stdout.write(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from monitor.daemon import DEFAULT_ADDRESS, MonitorDaemon
+
+
+class Command(BaseCommand):
+    help = "Run the TikTok/OBS monitor as a standalone daemon for the web workers to share."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--address",
+            default=getattr(settings, "MONITOR_DAEMON_ADDRESS", None) or DEFAULT_ADDRESS,
+            help=f"host:port to listen on (default: MONITOR_DAEMON_ADDRESS or {DEFAULT_ADDRESS})",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            server = MonitorDaemon(options["address"])
+        except (ValueError, OSError) as e:
+            raise CommandError(f"Could not start monitor daemon on {options['address']}: {e}")
+        host, port = server.server_address[:2]
+        self.stdout.write(self.style.SUCCESS(f"Monitor daemon listening on {host}:{port}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
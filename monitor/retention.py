@@ -0,0 +1,300 @@
+import json
+import math
+import os
+import threading
+import time
+
+VIDEO_DIR = os.path.expanduser("~\\Videos")
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.mov', '.avi')
+INDEX_FILE = "replay_index.json"
+
+MB = 1024 * 1024
+
+
+def normalize_path(path):
+    """Canonical spelling of a replay path, used for every index key.
+
+    OBS reports saved paths in its own form (e.g. forward slashes on Windows),
+    which must match what we build with os.path.join(VIDEO_DIR, name).
+    """
+    return os.path.normcase(os.path.abspath(path))
+
+
+class ReplayRetention:
+    """Size/age index of saved replays that enforces disk quotas.
+
+    The index is kept up to date by ``record()`` as OBS saves replays and is
+    persisted to INDEX_FILE. It is loaded on first use, listing the Videos
+    folder once to pick up files added or removed while we weren't running.
+    Evictions are collected and deleted in batches by a background thread
+    started with ``start()``; the index works without it.
+    Quotas of 0 mean "unlimited".
+    """
+
+    def __init__(self, video_dir=VIDEO_DIR, index_file=INDEX_FILE, log=None):
+        self.video_dir = video_dir
+        self.index_file = index_file
+        self._log = log or (lambda message, tag="info": None)
+
+        self.global_quota_mb = 0
+        self.stream_quota_mb = 0
+        self.max_age_days = 0
+        self.interval = 60
+
+        # normalized path -> {"name", "size", "ctime", "stream", "keep"}
+        # "name" keeps the file name's original case, which normcase may lower
+        self.entries = {}
+        # Running byte totals, overall and per stream, kept in sync with entries
+        self.total_size = 0
+        self.stream_sizes = {}
+
+        self.bad_index_file = index_file + ".bad"
+        # Set once the saved index has been read; nothing is saved before that,
+        # or the first save would replace the index and lose its keeper marks
+        self._loaded = False
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def configure(self, global_quota_mb=0, stream_quota_mb=0, max_age_days=0):
+        # These come from a hand-edited config file, so don't trust their types
+        self.global_quota_mb = self._limit("replay_quota_mb", global_quota_mb)
+        self.stream_quota_mb = self._limit("replay_stream_quota_mb", stream_quota_mb)
+        self.max_age_days = self._limit("replay_max_age_days", max_age_days)
+        self._wakeup.set()
+
+    def _limit(self, name, value):
+        """Coerce a quota setting to a number >= 0, treating bad values as unlimited."""
+        try:
+            number = float(value or 0)
+        except (TypeError, ValueError):
+            self._log(f"⚠️ Ignoring invalid {name}: {value!r} (expected a number)", "error")
+            return 0
+        if not math.isfinite(number) or number < 0:
+            self._log(f"⚠️ Ignoring invalid {name}: {value!r} (must be a finite number, 0 or more)", "error")
+            return 0
+        return int(number) if number.is_integer() else number
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="ReplayRetention", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.enforce()
+            except Exception as e:
+                self._log(f"❌ Replay retention failed: {e}", "error")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    # --- Index maintenance ---
+    def _add(self, path, entry):
+        path = normalize_path(path)
+        self._remove(path)
+        self.entries[path] = entry
+        self.total_size += entry["size"]
+        stream = entry["stream"]
+        self.stream_sizes[stream] = self.stream_sizes.get(stream, 0) + entry["size"]
+
+    def _remove(self, path):
+        entry = self.entries.pop(normalize_path(path), None)
+        if entry is None:
+            return None
+        self.total_size -= entry["size"]
+        stream = entry["stream"]
+        self.stream_sizes[stream] -= entry["size"]
+        if not self.stream_sizes[stream]:
+            del self.stream_sizes[stream]
+        return entry
+
+    def _ensure_loaded(self):
+        """Read the persisted index and reconcile it with one listing of video_dir.
+
+        Caller holds _lock. Runs once, on whichever call touches the index first.
+        """
+        if self._loaded:
+            return
+        self._loaded = True
+
+        saved = {}
+        index_ok = True
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, "r") as f:
+                    saved = json.load(f)
+            except Exception as e:
+                # Keep the unreadable file; it may hold the only copy of the keeper marks
+                index_ok = False
+                bad_file = self.bad_index_file
+                if os.path.exists(bad_file):
+                    bad_file = f"{bad_file}.{int(time.time())}"
+                try:
+                    os.replace(self.index_file, bad_file)
+                except OSError:
+                    pass
+                self._log(f"❌ Failed to load replay index ({e}); moved it to {bad_file}.", "error")
+        if self._deletion_paused():
+            self._log(f"⚠️ Replay deletion is paused while {self.bad_index_file} exists. "
+                      "Restore any keeper marks from it, then delete it.", "error")
+
+        for path, entry in saved.items():
+            if os.path.exists(path):
+                self._add(path, entry)
+        if os.path.exists(self.video_dir):
+            for name in os.listdir(self.video_dir):
+                path = os.path.join(self.video_dir, name)
+                if name.lower().endswith(VIDEO_EXTENSIONS) and normalize_path(path) not in self.entries:
+                    self._add(path, self._stat(path, None))
+        # After a failed read, don't write a clean-looking index with every keep=False
+        if index_ok:
+            self._save()
+
+    def _deletion_paused(self):
+        # Keeper marks may only survive in the .bad copy until an operator resolves it
+        return os.path.exists(self.bad_index_file)
+
+    def _save(self):
+        # Caller holds _lock
+        if not self._loaded:
+            return
+        # Write-then-rename so a crash mid-write never leaves a truncated index
+        tmp_file = self.index_file + ".tmp"
+        try:
+            with open(tmp_file, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_file, self.index_file)
+        except Exception as e:
+            self._log(f"Failed to save replay index: {e}", "error")
+
+    @staticmethod
+    def _stat(path, stream, keep=False):
+        stat = os.stat(path)
+        return {"name": os.path.basename(path), "size": stat.st_size, "ctime": stat.st_ctime, "stream": stream, "keep": keep}
+
+    def record(self, path, stream=None):
+        """Add a freshly saved replay to the index and schedule a quota check."""
+        try:
+            entry = self._stat(path, stream)
+        except OSError as e:
+            self._log(f"⚠️ Could not index replay {path}: {e}", "error")
+            return
+        with self._lock:
+            self._ensure_loaded()
+            # Re-recording a known file must not drop its keeper mark
+            existing = self.entries.get(normalize_path(path))
+            if existing is not None:
+                entry["keep"] = existing["keep"]
+            self._add(path, entry)
+            self._save()
+        self._wakeup.set()
+
+    def set_keep(self, path, keep):
+        with self._lock:
+            self._ensure_loaded()
+            entry = self.entries.get(normalize_path(path))
+            if entry is None:
+                return False
+            entry["keep"] = bool(keep)
+            self._save()
+        return True
+
+    def snapshot(self):
+        with self._lock:
+            self._ensure_loaded()
+            return {
+                "replays": [dict(entry, path=path) for path, entry in self.entries.items()],
+                "total_size": self.total_size,
+                "global_quota_mb": self.global_quota_mb,
+                "stream_quota_mb": self.stream_quota_mb,
+                "max_age_days": self.max_age_days,
+            }
+
+    # --- Eviction ---
+    def _select_victims(self, now):
+        """Pick replays to delete, oldest first, never touching keepers."""
+        candidates = sorted(
+            ((entry["ctime"], path) for path, entry in self.entries.items() if not entry["keep"]),
+        )
+        victims = []
+        removed_total = 0
+        removed_by_stream = {}
+
+        def take(path):
+            nonlocal removed_total
+            entry = self.entries[path]
+            victims.append(path)
+            removed_total += entry["size"]
+            removed_by_stream[entry["stream"]] = removed_by_stream.get(entry["stream"], 0) + entry["size"]
+
+        taken = set()
+        max_age = self.max_age_days * 86400
+        stream_quota = self.stream_quota_mb * MB
+        global_quota = self.global_quota_mb * MB
+        for ctime, path in candidates:
+            stream = self.entries[path]["stream"]
+            expired = max_age and now - ctime > max_age
+            over_stream_quota = stream_quota and stream is not None and \
+                self.stream_sizes[stream] - removed_by_stream.get(stream, 0) > stream_quota
+            if expired or over_stream_quota:
+                take(path)
+                taken.add(path)
+
+        if global_quota:
+            for _, path in candidates:
+                if self.total_size - removed_total <= global_quota:
+                    break
+                if path not in taken:
+                    take(path)
+        return victims
+
+    def _prune_missing(self):
+        """Drop entries whose file was deleted outside the app.
+
+        Otherwise they keep counting toward the quotas until restart, and a
+        vanished keeper would never leave the index at all.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            paths = list(self.entries)
+        missing = [path for path in paths if not os.path.exists(path)]
+        if missing:
+            with self._lock:
+                for path in missing:
+                    self._remove(path)
+                self._save()
+        return missing
+
+    def enforce(self):
+        self._prune_missing()
+        if self._deletion_paused():
+            return 0
+        with self._lock:
+            victims = [(path, self._remove(path)) for path in self._select_victims(time.time())]
+            if victims:
+                self._save()
+
+        # Delete outside the lock so record() from OBS callbacks never waits on disk I/O
+        freed = 0
+        failed = []
+        for path, entry in victims:
+            try:
+                os.remove(path)
+                freed += entry["size"]
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # Probably still open somewhere; put it back and retry next round
+                self._log(f"⚠️ Could not delete replay {os.path.basename(path)}: {e}", "error")
+                failed.append((path, entry))
+        if failed:
+            with self._lock:
+                for path, entry in failed:
+                    self._add(path, entry)
+                self._save()
+        if victims:
+            self._log(f"🧹 Replay retention removed {len(victims)} file(s), freed {freed / MB:.1f} MB", "info")
+        return freed
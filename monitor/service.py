@@ -3,15 +3,13 @@ import asyncio
 import json
 import os
 import time
+import uuid
 from datetime import datetime, timezone, timedelta
 from collections import deque
-import obsws_python as obs
-from TikTokLive import TikTokLiveClient
-from TikTokLive.events import ConnectEvent, CommentEvent
-from tiktok_live_patch import apply_patch
+from .retention import ReplayRetention
 
-# Apply Patch
-apply_patch()
+# obsws_python and TikTokLive (with its protobuf stack) are imported on first
+# use in connect_obs/start_stream, so importing this module stays cheap.
 
 CONFIG_FILE = "tiktok_obs_config.json"
 
@@ -34,9 +32,20 @@ class MonitorService:
         # Loop management
         self.loop_thread = None
         self.event_loop = None
+        # start_stream runs on request threads, so starting the loop is guarded
+        self._loop_lock = threading.Lock()
         
         self.logs = deque(maxlen=100)
-        self.notification_queue = deque()
+        self.notifications = deque(maxlen=50)
+
+        # Status versioning: every change bumps the counter and drops the cached
+        # /api/status bodies. The epoch tells clients the process restarted.
+        self._status_lock = threading.Lock()
+        self._status_epoch = uuid.uuid4().hex[:8]
+        self._status_counter = 0
+        self._status_reset_at = 0
+        self._status_state = None
+        self._status_cache = {}
         
         self.usernames = []
         self.obs_password = ""
@@ -46,26 +55,30 @@ class MonitorService:
         self.notification_duration = 5
         
         self.last_trigger = None
-        
+
+        self.retention = ReplayRetention(log=self.log)
+
         self._load_config()
-        # Start the loop thread immediately
-        self._start_loop_thread()
+        # The loop thread is started by start_stream, on first real use. The
+        # retention thread deletes files, so only the process that owns the
+        # monitor starts it (see daemon.get_service and MonitorDaemon).
 
     def _start_loop_thread(self):
-        if self.loop_thread and self.loop_thread.is_alive():
-            return
+        with self._loop_lock:
+            if self.loop_thread and self.loop_thread.is_alive():
+                return
 
-        def loop_entry():
-            self.event_loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(self.event_loop)
-            self.event_loop.run_forever()
+            # Create the loop here so self.event_loop is set before anyone can
+            # schedule on it, with no waiting on the new thread
+            loop = asyncio.new_event_loop()
 
-        self.loop_thread = threading.Thread(target=loop_entry, name="TikTokLoop", daemon=True)
-        self.loop_thread.start()
-        
-        # Wait for loop to be ready
-        while self.event_loop is None:
-            time.sleep(0.01)
+            def loop_entry():
+                asyncio.set_event_loop(loop)
+                loop.run_forever()
+
+            self.event_loop = loop
+            self.loop_thread = threading.Thread(target=loop_entry, name="TikTokLoop", daemon=True)
+            self.loop_thread.start()
 
     @property
     def is_monitoring(self):
@@ -75,12 +88,14 @@ class MonitorService:
     def log(self, message, tag="info", source_stream=None):
         timestamp = datetime.now().strftime("%H:%M:%S")
         full_msg = f"[{timestamp}] {message}" if not source_stream else f"[{timestamp}] [{source_stream}] {message}"
-        self.logs.append({
-            "message": message, 
-            "tag": tag, 
-            "timestamp": timestamp, 
-            "source_stream": source_stream
-        })
+        with self._status_lock:
+            self.logs.append({
+                "message": message, 
+                "tag": tag, 
+                "timestamp": timestamp, 
+                "source_stream": source_stream,
+                "v": self._bump_status()
+            })
         # print(full_msg)
 
     def _load_config(self):
@@ -99,6 +114,11 @@ class MonitorService:
                     self.keywords = data.get("keywords", "")
                     self.notifications_enabled = data.get("notifications_enabled", True)
                     self.notification_duration = data.get("notification_duration", 5)
+                    self.retention.configure(
+                        global_quota_mb=data.get("replay_quota_mb", 0),
+                        stream_quota_mb=data.get("replay_stream_quota_mb", 0),
+                        max_age_days=data.get("replay_max_age_days", 0)
+                    )
             except Exception as e:
                 self.log(f"Failed to load config: {e}", "error")
 
@@ -120,7 +140,11 @@ class MonitorService:
             "source_name": source_name,
             "keywords": keywords,
             "notifications_enabled": notifications_enabled,
-            "notification_duration": notification_duration
+            "notification_duration": notification_duration,
+            # Retention settings are only edited in the file; keep them on save
+            "replay_quota_mb": self.retention.global_quota_mb,
+            "replay_stream_quota_mb": self.retention.stream_quota_mb,
+            "replay_max_age_days": self.retention.max_age_days
         }
         try:
             with open(CONFIG_FILE, "w") as f:
@@ -133,6 +157,8 @@ class MonitorService:
             return False, "Please enter OBS Password"
 
         def _run_obs_setup():
+            import obsws_python as obs
+
             self.log("Connecting to OBS...", "info")
             
             # Cleanup existing connection if any
@@ -186,11 +212,13 @@ class MonitorService:
 
             if not self.last_trigger:
                 self.log(f"ℹ️ Replay saved to {saved_path} (No trigger info)", "info")
+                self.retention.record(saved_path)
                 return
 
             # Get Trigger Info
             user = self.last_trigger.get("user", "unknown")
             trigger = self.last_trigger.get("trigger", "unknown")
+            stream = self.last_trigger.get("stream")
             
             # Sanitize filenames
             invalid_chars = '<>:"/\\|?*'
@@ -220,10 +248,12 @@ class MonitorService:
                 try:
                     os.rename(saved_path, new_path)
                     self.log(f"✅ Replay renamed to: {new_filename}{extension}", "success")
+                    self.retention.record(new_path, stream)
                     break
                 except OSError as e:
                     if i == max_retries - 1:
                         self.log(f"❌ Failed to rename replay: {e}", "error")
+                        self.retention.record(saved_path, stream)
                     else:
                         time.sleep(0.5)
 
@@ -233,6 +263,11 @@ class MonitorService:
 
     def start_stream(self, username):
         from functools import partial
+        from TikTokLive import TikTokLiveClient
+        from TikTokLive.events import ConnectEvent, CommentEvent
+        from tiktok_live_patch import apply_patch
+
+        apply_patch()
         
         # Ensure loop is running
         self._start_loop_thread()
@@ -281,6 +316,103 @@ class MonitorService:
     def is_stream_active(self, username):
         return username in self.tiktok_clients and self.tiktok_clients[username].connected
 
+    # --- Views API ---
+    # The methods below only return plain data so the same calls can be served
+    # in-process or proxied through the monitor daemon (see monitor/daemon.py).
+    def get_config(self):
+        return {
+            "usernames": self.usernames,
+            "obs_password": self.obs_password,
+            "source_name": self.source_name,
+            "keywords": self.keywords,
+            "notifications_enabled": self.notifications_enabled,
+            "notification_duration": self.notification_duration,
+            "is_monitoring": self.is_monitoring,
+            "obs_connected": self.obs_client is not None
+        }
+
+    # --- Status snapshots ---
+    def _bump_status(self):
+        # Caller holds _status_lock
+        self._status_counter += 1
+        self._status_cache.clear()
+        return self._status_counter
+
+    def _sync_status(self):
+        """Bump the version if connection state changed behind our back.
+
+        Clients connect/disconnect on their own, so rather than hooking every
+        path we compare the cheap part of the status on each poll.
+        Caller holds _status_lock.
+        """
+        active_streams = {user: self.is_stream_active(user) for user in self.usernames}
+        state = (active_streams, self.obs_client is not None)
+        if state != self._status_state:
+            self._status_state = state
+            self._bump_status()
+
+    def status_snapshot(self, stream_filter=None, since=None, known_versions=None):
+        """Return (version, body) for /api/status, serialized once per version.
+
+        If the current version is in ``known_versions`` (the client's
+        If-None-Match), body is None: nothing changed, so no body is built.
+
+        With ``since`` set to a version the client already has, the body only
+        carries the logs and notifications added after it ("delta": true).
+        Unknown or pre-clear versions get the full snapshot instead. The full
+        snapshot carries no notifications; a freshly opened tab shouldn't
+        replay old toasts.
+        """
+        with self._status_lock:
+            self._sync_status()
+            version = f"{self._status_epoch}.{self._status_counter}"
+            if known_versions and version in known_versions:
+                return version, None
+            key = (stream_filter, since)
+            body = self._status_cache.get(key)
+            if body is not None:
+                return version, body
+
+            since_counter = None
+            if since:
+                epoch, _, counter = since.partition(".")
+                if epoch == self._status_epoch and counter.isdigit() and int(counter) >= self._status_reset_at:
+                    since_counter = int(counter)
+
+            # Support filtering logs by source stream
+            logs = [log for log in self.logs if not stream_filter or log.get('source_stream') == stream_filter]
+            if since_counter is None:
+                notifications = []
+            else:
+                logs = [log for log in logs if log["v"] > since_counter]
+                notifications = [n for n in self.notifications if n["v"] > since_counter]
+
+            active_streams, obs_connected = self._status_state
+            body = json.dumps({
+                "version": version,
+                "delta": since_counter is not None,
+                "logs": logs,
+                "active_streams": active_streams, # Map of username -> bool (is_monitoring)
+                "obs_connected": obs_connected,
+                "notifications": notifications
+            }, separators=(",", ":")).encode("utf-8")
+
+            # Pollers at the same version share one body; bound the odd stragglers
+            if len(self._status_cache) < 64:
+                self._status_cache[key] = body
+            return version, body
+
+    def clear_logs(self):
+        with self._status_lock:
+            self.logs.clear()
+            self._status_reset_at = self._bump_status()
+
+    def get_replays(self):
+        return self.retention.snapshot()
+
+    def set_replay_keep(self, path, keep):
+        return self.retention.set_keep(path, keep)
+
     # --- Event Handlers ---
     async def _on_connect(self, event, source_stream):
         self.log(f"✅ Connected to @{source_stream} LIVE!", "success", source_stream)
@@ -300,17 +432,19 @@ class MonitorService:
             
             self.log(f"🚨 TRIGGER: '{found_trigger}' by {user_display}: {msg}", "trigger", source_stream)
             
-            self.notification_queue.append({
-                "user": source_stream,
-                "message": msg,
-                "keyword": found_trigger
-            })
+            with self._status_lock:
+                self.notifications.append({
+                    "user": source_stream,
+                    "message": msg,
+                    "keyword": found_trigger,
+                    "v": self._bump_status()
+                })
             
             if self.obs_client:
                 try:
                     # Use chatter's username instead of source_stream
                     chatter_name = getattr(event.user, "unique_id", "unknown_user")
-                    self.last_trigger = {"user": chatter_name, "trigger": found_trigger}
+                    self.last_trigger = {"user": chatter_name, "trigger": found_trigger, "stream": source_stream}
                     
                     self.obs_client.save_replay_buffer()
                     self.log("💾 OBS Replay Triggered!", "success", source_stream)
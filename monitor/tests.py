@@ -1,3 +1,366 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from .daemon import MonitorClient, MonitorDaemon
+from .retention import MB, ReplayRetention, normalize_path
+from .service import MonitorService
+
+
+class ReplayRetentionTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.video_dir = os.path.join(self.tmp, "Videos")
+        os.mkdir(self.video_dir)
+        self.index_file = os.path.join(self.tmp, "replay_index.json")
+        self.retention = ReplayRetention(video_dir=self.video_dir, index_file=self.index_file)
+
+    def make_replay(self, name, size_mb=1, stream=None, age_days=0, keep=False):
+        path = os.path.join(self.video_dir, name)
+        with open(path, "wb") as f:
+            f.write(b"\0" * int(size_mb * MB))
+        self.retention.record(path, stream)
+        entry = self.retention.entries[normalize_path(path)]
+        entry["ctime"] = time.time() - age_days * 86400
+        entry["keep"] = keep
+        return path
+
+    def remaining(self):
+        return sorted(os.listdir(self.video_dir))
+
+    def test_age_limit_evicts_old_replays(self):
+        self.make_replay("old.mp4", age_days=10)
+        self.make_replay("new.mp4", age_days=1)
+        self.retention.configure(max_age_days=7)
+        self.retention.enforce()
+        self.assertEqual(self.remaining(), ["new.mp4"])
+
+    def test_stream_quota_evicts_oldest_of_that_stream(self):
+        self.make_replay("a1.mp4", stream="a", age_days=3)
+        self.make_replay("a2.mp4", stream="a", age_days=2)
+        self.make_replay("a3.mp4", stream="a", age_days=1)
+        self.make_replay("b1.mp4", stream="b", age_days=5)
+        self.retention.configure(stream_quota_mb=2)
+        self.retention.enforce()
+        self.assertEqual(self.remaining(), ["a2.mp4", "a3.mp4", "b1.mp4"])
+        self.assertEqual(self.retention.stream_sizes, {"a": 2 * MB, "b": MB})
+
+    def test_global_quota_evicts_oldest_overall(self):
+        self.make_replay("a.mp4", stream="a", age_days=3)
+        self.make_replay("b.mp4", stream="b", age_days=2)
+        self.make_replay("c.mp4", age_days=1)
+        self.retention.configure(global_quota_mb=2)
+        freed = self.retention.enforce()
+        self.assertEqual(freed, MB)
+        self.assertEqual(self.remaining(), ["b.mp4", "c.mp4"])
+        self.assertEqual(self.retention.total_size, 2 * MB)
+
+    def test_keepers_are_never_selected(self):
+        self.make_replay("keeper.mp4", stream="a", age_days=30, keep=True)
+        self.make_replay("other.mp4", stream="a", age_days=1)
+        self.retention.configure(global_quota_mb=1, stream_quota_mb=1, max_age_days=7)
+        self.retention.enforce()
+        self.assertEqual(self.remaining(), ["keeper.mp4"])
+
+    def test_keeper_marked_under_another_spelling_is_protected(self):
+        # OBS reports its own spelling of the saved path
+        path = self.make_replay("clip.mp4", age_days=30)
+        self.retention.record(os.path.join(self.video_dir, ".", "clip.mp4"))
+        self.assertEqual(len(self.retention.entries), 1)
+        self.assertEqual(self.retention.total_size, MB)
+
+        self.assertTrue(self.retention.set_keep(os.path.join(self.tmp, "Videos", "..", "Videos", "clip.mp4"), True))
+        self.retention.configure(max_age_days=1)
+        self.retention.enforce()
+        self.assertTrue(os.path.exists(path))
+
+    def test_failed_delete_puts_entry_back(self):
+        path = self.make_replay("locked.mp4", stream="a", age_days=10)
+        self.retention.configure(max_age_days=7)
+        with mock.patch("monitor.retention.os.remove", side_effect=PermissionError("in use")):
+            self.assertEqual(self.retention.enforce(), 0)
+        self.assertIn(normalize_path(path), self.retention.entries)
+        self.assertEqual(self.retention.total_size, MB)
+        self.assertEqual(self.retention.stream_sizes, {"a": MB})
+
+        # Retried on the next pass
+        self.retention.enforce()
+        self.assertEqual(self.remaining(), [])
+        self.assertEqual(self.retention.total_size, 0)
+
+    def test_files_deleted_outside_the_app_are_dropped(self):
+        path = self.make_replay("gone.mp4", keep=True)
+        self.make_replay("kept.mp4")
+        os.remove(path)
+        self.retention.enforce()
+        self.assertNotIn(normalize_path(path), self.retention.entries)
+        self.assertEqual(self.retention.total_size, MB)
+
+    def test_index_round_trips_keeper_marks(self):
+        path = self.make_replay("clip.mp4", stream="a")
+        self.retention.set_keep(path, True)
+
+        reloaded = ReplayRetention(video_dir=self.video_dir, index_file=self.index_file)
+        entry = {r["path"]: r for r in reloaded.snapshot()["replays"]}[normalize_path(path)]
+        self.assertEqual((entry["stream"], entry["keep"]), ("a", True))
+
+    def test_first_record_keeps_the_saved_index(self):
+        # No start(), as with MONITOR_RETENTION off or before the thread runs
+        keeper = self.make_replay("keeper.mp4", keep=True)
+        self.retention.set_keep(keeper, True)
+
+        fresh = ReplayRetention(video_dir=self.video_dir, index_file=self.index_file)
+        new = os.path.join(self.video_dir, "new.mp4")
+        with open(new, "wb") as f:
+            f.write(b"\0")
+        fresh.record(new)
+
+        with open(self.index_file) as f:
+            saved = json.load(f)
+        self.assertEqual(
+            {os.path.basename(p): e["keep"] for p, e in saved.items()},
+            {"keeper.mp4": True, "new.mp4": False},
+        )
+
+    def test_unreadable_index_pauses_eviction_across_restarts(self):
+        path = self.make_replay("clip.mp4", age_days=30)
+        with open(self.index_file, "w") as f:
+            f.write('{"truncated')
+
+        reloaded = ReplayRetention(video_dir=self.video_dir, index_file=self.index_file)
+        reloaded.configure(max_age_days=1)
+        reloaded.enforce()
+        self.assertEqual(self.remaining(), ["clip.mp4"])
+        self.assertTrue(os.path.exists(self.index_file + ".bad"))
+        # No clean-looking index with every keep=False was written in its place
+        self.assertFalse(os.path.exists(self.index_file))
+
+        # A restart still finds the .bad copy and keeps deletion paused
+        restarted = ReplayRetention(video_dir=self.video_dir, index_file=self.index_file)
+        restarted.configure(max_age_days=1)
+        restarted.enforce()
+        self.assertEqual(self.remaining(), ["clip.mp4"])
+
+        # Until an operator resolves it (the rebuilt entry has the file's real ctime)
+        restarted.entries[normalize_path(path)]["ctime"] -= 30 * 86400
+        os.remove(self.index_file + ".bad")
+        restarted.enforce()
+        self.assertEqual(self.remaining(), [])
+
+    def test_configure_coerces_bad_values(self):
+        logged = []
+        retention = ReplayRetention(log=lambda message, tag="info": logged.append(message))
+        retention.configure(global_quota_mb="500", stream_quota_mb=-1, max_age_days="soon")
+        self.assertEqual(
+            (retention.global_quota_mb, retention.stream_quota_mb, retention.max_age_days),
+            (500, 0, 0),
+        )
+        self.assertEqual(len(logged), 2)
+
+
+@override_settings(MONITOR_DAEMON_ADDRESS=None, MONITOR_RETENTION=False)
+class ReplayViewTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.video_dir = os.path.join(self.tmp, "Videos")
+        os.mkdir(self.video_dir)
+        for name in ("Clip_One.mp4", "notes.txt"):
+            with open(os.path.join(self.video_dir, name), "wb") as f:
+                f.write(b"\0" * 10)
+
+        self.service = MonitorService()
+        self.service.retention = ReplayRetention(
+            video_dir=self.video_dir, index_file=os.path.join(self.tmp, "replay_index.json")
+        )
+        for patcher in (
+            mock.patch.object(MonitorService, "_instance", self.service),
+            mock.patch("monitor.views.VIDEO_DIR", self.video_dir),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_replays_lists_indexed_videos_without_retention_running(self):
+        response = self.client.get("/replays/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([v["name"] for v in response.context["videos"]], ["Clip_One.mp4"])
+
+    def test_replay_keep_marks_and_unmarks(self):
+        response = self.client.post("/api/replay_keep", {"name": "Clip_One.mp4", "keep": "true"})
+        self.assertEqual(response.json()["status"], "ok")
+        videos = self.client.get("/replays/").context["videos"]
+        self.assertTrue(videos[0]["keep"])
+
+        self.client.post("/api/replay_keep", {"name": "Clip_One.mp4", "keep": "false"})
+        videos = self.client.get("/replays/").context["videos"]
+        self.assertFalse(videos[0]["keep"])
+
+    def test_replay_keep_unknown_file(self):
+        response = self.client.post("/api/replay_keep", {"name": "missing.mp4", "keep": "true"})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get("/api/replay_keep").status_code, 400)
+
+
+class LoopThreadTests(SimpleTestCase):
+    def test_concurrent_starts_share_one_event_loop(self):
+        service = MonitorService()
+        barrier = threading.Barrier(8)
+        seen = []
+
+        def start():
+            barrier.wait()
+            service._start_loop_thread()
+            seen.append((service.loop_thread, service.event_loop))
+
+        threads = [threading.Thread(target=start) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.addCleanup(service.event_loop.call_soon_threadsafe, service.event_loop.stop)
+
+        self.assertEqual(len(set(seen)), 1)
+        self.assertIsNotNone(service.event_loop)
+        self.assertEqual(sum(t.name == "TikTokLoop" for t in threading.enumerate()), 1)
+
+
+class StatusSnapshotTests(SimpleTestCase):
+    def setUp(self):
+        self.service = MonitorService()
+        self.service.usernames = ["a", "b"]
+
+    def snapshot(self, *args):
+        version, body = self.service.status_snapshot(*args)
+        return version, json.loads(body)
+
+    def test_changes_bump_the_version(self):
+        v1, _ = self.snapshot()
+        self.service.log("hello")
+        v2, data = self.snapshot()
+        self.assertNotEqual(v1, v2)
+        self.assertEqual(data["version"], v2)
+
+        # Connection state changes without a log line still bump it
+        self.service.obs_client = object()
+        v3, data = self.snapshot()
+        self.assertNotEqual(v2, v3)
+        self.assertTrue(data["obs_connected"])
+
+    def test_same_version_reuses_the_serialized_body(self):
+        self.service.log("hello")
+        _, body1 = self.service.status_snapshot()
+        _, body2 = self.service.status_snapshot()
+        self.assertIs(body1, body2)
+
+    def test_known_version_returns_no_body(self):
+        version, _ = self.snapshot()
+        self.assertEqual(self.service.status_snapshot(None, None, [version]), (version, None))
+        self.service.log("hello")
+        self.assertIsNotNone(self.service.status_snapshot(None, None, [version])[1])
+
+    def test_delta_only_carries_newer_logs_and_notifications(self):
+        self.service.log("old", source_stream="a")
+        since, full = self.snapshot()
+        self.assertFalse(full["delta"])
+        self.assertEqual(full["notifications"], [])
+
+        self.service.log("new a", source_stream="a")
+        self.service.log("new b", source_stream="b")
+        with self.service._status_lock:
+            self.service.notifications.append({"user": "a", "message": "hi", "keyword": "hi", "v": self.service._bump_status()})
+
+        _, delta = self.snapshot(None, since)
+        self.assertTrue(delta["delta"])
+        self.assertEqual([log["message"] for log in delta["logs"]], ["new a", "new b"])
+        self.assertEqual([n["message"] for n in delta["notifications"]], ["hi"])
+
+        _, filtered = self.snapshot("a", since)
+        self.assertEqual([log["message"] for log in filtered["logs"]], ["new a"])
+
+    def test_pre_clear_and_foreign_versions_get_a_full_snapshot(self):
+        self.service.log("before")
+        before_clear, _ = self.snapshot()
+        self.service.clear_logs()
+        self.service.log("after")
+
+        _, data = self.snapshot(None, before_clear)
+        self.assertFalse(data["delta"])
+        self.assertEqual([log["message"] for log in data["logs"]], ["after"])
+
+        _, data = self.snapshot(None, "otherepoch.1")
+        self.assertFalse(data["delta"])
+
+        _, data = self.snapshot(None, "garbage")
+        self.assertFalse(data["delta"])
+
+
+@override_settings(MONITOR_DAEMON_ADDRESS=None, MONITOR_RETENTION=False)
+class StatusViewTests(SimpleTestCase):
+    def setUp(self):
+        self.service = MonitorService()
+        patcher = mock.patch.object(MonitorService, "_instance", self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_if_none_match_returns_304(self):
+        response = self.client.get("/api/status")
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('W/"'))
+
+        for tag in (etag, etag[2:], f'"stale", {etag}'):
+            response = self.client.get("/api/status", HTTP_IF_NONE_MATCH=tag)
+            self.assertEqual(response.status_code, 304)
+
+        self.service.log("changed")
+        response = self.client.get("/api/status", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_large_bodies_are_gzipped(self):
+        for i in range(50):
+            self.service.log(f"line {i}")
+        response = self.client.get("/api/status", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data["logs"]), 50)
+
+
+class DaemonRoundTripTests(SimpleTestCase):
+    def setUp(self):
+        self.service = MonitorService()
+        with mock.patch.object(MonitorService, "get_instance", return_value=self.service), \
+                mock.patch.object(self.service.retention, "start"):
+            self.server = MonitorDaemon("127.0.0.1:0")
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        host, port = self.server.server_address[:2]
+        self.client = MonitorClient(f"{host}:{port}")
+
+    def test_status_snapshot_bodies_survive_the_round_trip(self):
+        self.service.log("héllo 🚨")
+        local = self.service.status_snapshot()
+        remote = self.client.status_snapshot()
+        self.assertEqual(remote, local)
+        self.assertIsInstance(remote[1], bytes)
+
+        self.assertEqual(self.client.status_snapshot(None, None, [local[0]]), (local[0], None))
+
+    def test_port_in_use_fails_before_starting_retention(self):
+        service = MonitorService()
+        with mock.patch.object(MonitorService, "get_instance", return_value=service), \
+                mock.patch.object(service.retention, "start") as start:
+            with self.assertRaises(OSError):
+                MonitorDaemon("%s:%d" % self.server.server_address[:2])
+        start.assert_not_called()
+
+    def test_non_loopback_addresses_are_refused(self):
+        with self.assertRaises(ValueError):
+            MonitorClient("0.0.0.0:8765")
@@ -8,6 +8,7 @@ urlpatterns = [
     path('api/stream_action', views.stream_action, name='stream_action'),
     path('api/status', views.get_status, name='get_status'),
     path('api/clear_logs', views.clear_logs, name='clear_logs'),
+    path('api/replay_keep', views.replay_keep, name='replay_keep'),
     path('replays/', views.replays, name='replays'),
     path('video/<str:filename>', views.serve_video, name='serve_video'),
 ]
@@ -1,47 +1,82 @@
 from django.shortcuts import render
-from django.http import JsonResponse, FileResponse, Http404
+from django.http import JsonResponse, FileResponse, Http404, HttpResponse, HttpResponseNotModified
 from django.views.decorators.csrf import csrf_exempt
-from .service import MonitorService
+from .daemon import DaemonError, get_service
+from .retention import VIDEO_DIR, normalize_path
+import functools
+import gzip
 import os
 from datetime import datetime
 
+def daemon_errors(view):
+    """Report an unreachable monitor daemon as JSON instead of a 500 page."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except DaemonError as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=503)
+    return wrapper
+
+def daemon_error_page(view):
+    """Same as daemon_errors, for views that render HTML pages."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except DaemonError as e:
+            return render(request, 'monitor/daemon_error.html', {'message': str(e)}, status=503)
+    return wrapper
+
+@daemon_error_page
 def index(request):
-    service = MonitorService.get_instance()
-    context = {
-        "usernames": service.usernames,
-        "obs_password": service.obs_password,
-        "source_name": service.source_name,
-        "keywords": service.keywords,
-        "notifications_enabled": service.notifications_enabled,
-        "notification_duration": service.notification_duration,
-        "is_monitoring": service.is_monitoring,
-        "obs_connected": service.obs_client is not None
-    }
+    service = get_service()
+    context = service.get_config()
     return render(request, 'monitor/index.html', context)
 
+@daemon_error_page
 def replays(request):
-    video_dir = os.path.expanduser("~\\Videos")
+    # Served from the retention index instead of rescanning the Videos folder
+    index = get_service().get_replays()
+    video_dir = normalize_path(VIDEO_DIR)
     videos = []
-    if os.path.exists(video_dir):
-        # List only video files, sort by creation time desc
-        for f in os.listdir(video_dir):
-            if f.lower().endswith(('.mp4', '.mkv', '.mov', '.avi')):
-                path = os.path.join(video_dir, f)
-                stat = os.stat(path)
-                videos.append({
-                    'name': f,
-                    'size': f"{stat.st_size / (1024*1024):.1f} MB",
-                    'date': datetime.fromtimestamp(stat.st_ctime),
-                    'path': path
-                })
+    for replay in index['replays']:
+        # Only files we can actually serve from the Videos folder
+        if os.path.dirname(replay['path']) != video_dir:
+            continue
+        videos.append({
+            'name': replay.get('name') or os.path.basename(replay['path']),
+            'size': f"{replay['size'] / (1024*1024):.1f} MB",
+            'date': datetime.fromtimestamp(replay['ctime']),
+            'path': replay['path'],
+            'stream': replay['stream'],
+            'keep': replay['keep']
+        })
     
     # Sort by date desc
     videos.sort(key=lambda x: x['date'], reverse=True)
     
-    return render(request, 'monitor/replays.html', {'videos': videos})
+    context = {
+        'videos': videos,
+        'total_size': f"{index['total_size'] / (1024*1024):.1f} MB",
+        'global_quota_mb': index['global_quota_mb'],
+    }
+    return render(request, 'monitor/replays.html', context)
+
+@csrf_exempt
+@daemon_errors
+def replay_keep(request):
+    if request.method == "POST":
+        filename = request.POST.get("name", "")
+        keep = request.POST.get("keep") == 'true'
+        path = os.path.join(VIDEO_DIR, os.path.basename(filename))
+        if get_service().set_replay_keep(path, keep):
+            return JsonResponse({"status": "ok", "message": "Marked as keeper" if keep else "Keeper mark removed"})
+        return JsonResponse({"status": "error", "message": "Replay not found"}, status=404)
+    return JsonResponse({"status": "error"}, status=400)
 
 def serve_video(request, filename):
-    video_dir = os.path.expanduser("~\\Videos")
+    video_dir = VIDEO_DIR
     path = os.path.join(video_dir, filename)
     
     # Security check to prevent path traversal
@@ -53,9 +88,10 @@ def serve_video(request, filename):
     raise Http404("Video not found")
 
 @csrf_exempt
+@daemon_errors
 def save_config(request):
     if request.method == "POST":
-        service = MonitorService.get_instance()
+        service = get_service()
         usernames_raw = request.POST.get("username")
         
         if not usernames_raw:
@@ -85,14 +121,16 @@ def save_config(request):
     return JsonResponse({"status": "error"}, status=400)
 
 @csrf_exempt
+@daemon_errors
 def connect_obs(request):
-    service = MonitorService.get_instance()
+    service = get_service()
     success, msg = service.connect_obs()
     return JsonResponse({"status": "ok" if success else "error", "message": msg})
 
 @csrf_exempt
+@daemon_errors
 def stream_action(request):
-    service = MonitorService.get_instance()
+    service = get_service()
     if request.method == "POST":
         action = request.POST.get("action") # start or stop
         username = request.POST.get("username")
@@ -109,34 +147,52 @@ def stream_action(request):
             
     return JsonResponse({"status": "error", "message": "Invalid action"})
 
+@functools.lru_cache(maxsize=32)
+def _gzip_status(body):
+    # Every poller at the same version gets the same body, so compress it once
+    return gzip.compress(body, compresslevel=6)
+
+def _if_none_match_versions(request):
+    """Status versions named in If-None-Match, accepting weak and strong tags."""
+    versions = []
+    for tag in request.headers.get('If-None-Match', '').split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        versions.append(tag.strip('"'))
+    return [v for v in versions if v]
+
+@daemon_errors
 def get_status(request):
-    service = MonitorService.get_instance()
-    notifications = []
-    while service.notification_queue:
-        notifications.append(service.notification_queue.popleft())
-        
-    # Support filtering logs by source stream
+    service = get_service()
+
+    # Support filtering logs by source stream, and deltas against ?since=<version>
     stream_filter = request.GET.get('stream')
-    logs = list(service.logs)
-    
-    if stream_filter:
-        logs = [log for log in logs if log.get('source_stream') == stream_filter]
-        
-    # Get active streams status
-    active_streams = {}
-    for user in service.usernames:
-        active_streams[user] = service.is_stream_active(user)
-        
-    return JsonResponse({
-        "logs": logs,
-        "active_streams": active_streams, # Map of username -> bool (is_monitoring)
-        "obs_connected": service.obs_client is not None,
-        "notifications": notifications
-    })
+    since = request.GET.get('since')
+    version, body = service.status_snapshot(stream_filter, since, _if_none_match_versions(request))
+
+    # Weak: the gzip and identity bodies of a version are equivalent, not byte-identical
+    etag = f'W/"{version}"'
+    if body is None:
+        # Nothing changed since the client's copy
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    response = HttpResponse(content_type='application/json')
+    if len(body) > 512 and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        body = _gzip_status(body)
+        response['Content-Encoding'] = 'gzip'
+    response.content = body
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    response['Vary'] = 'Accept-Encoding'
+    return response
 
 
 @csrf_exempt
+@daemon_errors
 def clear_logs(request):
-    service = MonitorService.get_instance()
-    service.logs.clear()
+    service = get_service()
+    service.clear_logs()
     return JsonResponse({"status": "ok", "message": "Logs cleared"})
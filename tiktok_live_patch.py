@@ -1,7 +1,11 @@
-from TikTokLive.events import ConnectEvent, CommentEvent
+_applied = False
 
 def apply_patch():
     # --- MONKEY PATCH FOR TIKTOKLIVE/BETTERPROTO ISSUE ---
+    # Safe to call repeatedly; the patch is only installed once per process.
+    global _applied
+    if _applied:
+        return
     try:
         from TikTokLive.proto import custom_proto
         
@@ -20,6 +24,7 @@ def apply_patch():
             return custom_proto.ExtendedUser(**data)
 
         custom_proto.from_user = _patched_from_user
+        _applied = True
         print("TikTokLive Monkey Patch Applied.")
     except Exception as e:
         print(f"Warning: Failed to patch TikTokLive: {e}")
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -121,3 +122,16 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Monitor daemon
+# Set to "host:port" (e.g. "127.0.0.1:8765") to have the views talk to a
+# monitor started with `manage.py runmonitor` instead of an in-process one.
+# Required when serving with more than one worker process.
+
+MONITOR_DAEMON_ADDRESS = os.environ.get('MONITOR_DAEMON_ADDRESS')
+
+# Whether an embedded monitor runs replay retention (quota deletions). The
+# daemon always does; turn this off for embedded processes that shouldn't
+# touch the Videos folder.
+
+MONITOR_RETENTION = True